@@ -1,14 +1,60 @@
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import date
 
+import io
 import json
+import os
+import threading
+import uuid
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
 
+try:
+    import orjson
+except ImportError:  # orjson nélkül a standard json modul is működik, csak lassabb
+    orjson = None
+
 # --- Beállítások ---
-DATA_FILE = Path("data/koltsegek.json")
+DATA_FILE = Path("data/koltsegek.jsonl")
+LEGACY_DATA_FILE = Path("data/koltsegek.json")
+# Az új tételek ide kerülnek (write-ahead log), a DATA_FILE-ba csak tömörítéskor
+WAL_FILE = DATA_FILE.with_suffix(".wal.jsonl")
+# A WAL első sora {"_wal": azonosító}; a fő fájl ugyanilyen sora jelzi, melyik
+# WAL-t olvasztotta már be (összeomlás után így nem olvassuk be kétszer)
+WAL_FEJLEC = "_wal"
+# Tömörítési küszöb: a WAL legalább ekkora, és nagyobb a fő adatfájlnál
+WAL_MIN_BYTES = 64 * 1024
 SETTINGS_FILE = Path("data/beallitasok.json")
 
+# A tételek saját oszlopai (megjelenítéshez, exporthoz); a get_dataframe
+# ezek mellé számolt segédoszlopokat is ad ("id", "hbucket").
+TETEL_OSZLOPOK = ["datum", "osszeg", "kategoria", "megjegyzes", "tipus"]
+TIPUS_DTYPE = pd.CategoricalDtype(["kiadas", "bevetel"])
+TIPUS_CIMKEK = {"kiadas": "Kiadás", "bevetel": "Bevétel"}
+# Alapértelmezett kategóriák típusonként (új tétel és szerkesztés űrlapjaihoz)
+_KATEGORIAK_KIADAS = (
+    "Étkezés",
+    "Lakhatás",
+    "Közlekedés",
+    "Szórakozás",
+    "Egészség",
+    "Bevásárlás",
+    "Egyéb",
+)
+_KATEGORIAK_BEVETEL = ("Fizetés", "Ösztöndíj", "Ajándék", "Egyéb bevétel")
+_KATEGORIAK = {"kiadas": _KATEGORIAK_KIADAS, "bevetel": _KATEGORIAK_BEVETEL}
+# A "datum" oszlop datetime64; a táblázatokban idő nélkül jelenítjük meg
+DATUM_OSZLOP = {"datum": st.column_config.DateColumn("datum", format="YYYY-MM-DD")}
+# A tétellista egy oldalán megjelenő sorok száma
+LISTA_OLDALMERET = 50
+# Növelni kell, ha a get_dataframe kimenetének szerkezete változik – a régi
+# Parquet pillanatképeket ilyenkor figyelmen kívül hagyjuk.
+DF_SEMA_VERZIO = 5
+
 st.set_page_config(
     page_title="Költségkövető",
     page_icon="💰",
@@ -23,40 +69,255 @@ def ensure_data_dir() -> None:
     DATA_FILE.parent.mkdir(exist_ok=True)
 
 
-def load_data() -> list[dict]:
-    """Betölti a tételeket (kiadás + bevétel)."""
-    ensure_data_dir()
-    if not DATA_FILE.exists():
-        return []
+def _json_loads(raw: bytes):
+    """JSON bájtok → Python objektum (orjson, ha elérhető)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
+
+def _json_dumps(obj) -> bytes:
+    """Python objektum → tömör, UTF-8 JSON bájtok (orjson, ha elérhető)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _mtime_ns(path: Path) -> int:
+    """A fájl módosítási ideje (ns), ha nem létezik: 0. Cache-kulcsnak használjuk.
+
+    Minden rerun meghívja, ezért egyetlen stat() hívással dolgozik.
+    """
     try:
-        with DATA_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, list):
-            return []
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def data_snapshot() -> tuple[str, int]:
+    """(útvonal, mtime) pár, ami egyértelműen azonosítja az adatok aktuális állapotát.
+
+    Az adatfájl és a WAL közül a később módosított számít: bármelyik írása
+    új kulcsot ad.
+    """
+    return str(DATA_FILE), max(_mtime_ns(DATA_FILE), _mtime_ns(WAL_FILE))
+
+
+def _read_jsonl(path: Path) -> list[dict]:
+    """Soronként egy JSON rekord (JSONL) beolvasása.
+
+    A hibás sorokat (pl. félbeszakadt írás) kihagyjuk, a többi tétel így is
+    betölthető marad.
+    """
+    if not path.exists():
+        return []
+
+    data = []
+    for line in path.read_bytes().splitlines():
+        if not line:
+            continue
+        try:
+            t = _json_loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(t, dict) or WAL_FEJLEC in t:
+            continue
 
         # Régi rekordok kompatibilitása: ha nincs 'tipus', tekintsük kiadásnak
-        for t in data:
-            if "tipus" not in t:
-                t["tipus"] = "kiadas"
+        if "tipus" not in t:
+            t["tipus"] = "kiadas"
+        data.append(t)
+    return data
+
+
+@st.cache_data(show_spinner=False)
+def _load_data_cached(path: str, mtime_ns: int) -> list[dict]:
+    """A tényleges beolvasás; az mtime_ns csak a cache kulcsa miatt paraméter.
+
+    Először a tömörített adatfájl, utána a WAL-ban lévő újabb tételek.
+    """
+    data_file = Path(path)
+    wal_file = data_file.with_suffix(".wal.jsonl")
+    data = _read_jsonl(data_file)
+    if _wal_beolvasztva(data_file, wal_file):
         return data
+    return data + _read_jsonl(wal_file)
+
+
+def _wal_azonosito(path: Path) -> str | None:
+    """A fájl első sorában álló WAL-azonosító (fejléc), ha van ilyen."""
+    try:
+        with path.open("rb") as f:
+            sor = f.readline()
+    except FileNotFoundError:
+        return None
+    try:
+        fejlec = _json_loads(sor)
     except json.JSONDecodeError:
-        return []
+        return None
+    return fejlec.get(WAL_FEJLEC) if isinstance(fejlec, dict) else None
 
 
-def save_data(data: list[dict]) -> None:
+def _wal_beolvasztva(data_file: Path, wal_file: Path) -> bool:
+    """True, ha a WAL tartalma már a fő fájlban van (a törlése előtt állt le a program)."""
+    wal_id = _wal_azonosito(wal_file)
+    return wal_id is not None and wal_id == _wal_azonosito(data_file)
+
+
+def _wal_takaritas() -> None:
+    """A már beolvasztott WAL törlése, hogy új tétel ne kerüljön bele."""
+    with _allapot_zar():
+        if _wal_beolvasztva(DATA_FILE, WAL_FILE):
+            WAL_FILE.unlink(missing_ok=True)
+            _fsync_dir(WAL_FILE.parent)
+
+
+def migrate_legacy_data() -> None:
+    """Egyszeri átállás: a régi JSON tömböt (koltsegek.json) JSONL-be írja át."""
+    if DATA_FILE.exists() or not LEGACY_DATA_FILE.exists():
+        return
+
+    try:
+        data = _json_loads(LEGACY_DATA_FILE.read_bytes())
+    except json.JSONDecodeError:
+        return
+    if isinstance(data, list):
+        save_data(data)
+
+
+def load_data() -> list[dict]:
+    """Betölti a tételeket (kiadás + bevétel).
+
+    Amíg a fájl nem változik, a rerunok a memóriából kapják az adatot.
+    A cache minden híváskor másolatot ad vissza, így a lista szabadon módosítható.
+    """
     ensure_data_dir()
-    with DATA_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    migrate_legacy_data()
+    _wal_takaritas()
+    return _load_data_cached(*data_snapshot())
 
 
-def load_settings() -> dict:
+def _invalidate_data_cache() -> None:
+    _load_data_cached.clear()
+    build_csv_bytes.clear()
+    tar = _megosztott_tar()
+    tar.pop("df", None)
+    tar.pop("cube", None)
+
+
+def _atomic_write(path: Path, payload: bytes) -> None:
+    """Ideiglenes fájlba ír, majd egy lépésben lecseréli vele a célfájlt.
+
+    Írás közbeni összeomlásnál a régi fájl érintetlen marad, nem kapunk
+    félig kiírt (csonka) JSON-t. Az ideiglenes fájl neve szálanként egyedi,
+    így két párhuzamos mentés nem írja egymás félkész fájlját.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path) -> None:
+    """A könyvtár bejegyzéseinek (csere, törlés) lemezre írása; Windows alatt nem lehet, kihagyjuk."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _mar_kiirva(kulcs: str, payload: bytes, allapot) -> bool:
+    """True, ha ez a folyamat utoljára pontosan ezt írta ki, és a fájl azóta sem változott."""
+    return _allapot_tar().get(kulcs) == (hash(payload), allapot)
+
+
+def save_data(data: list[dict]) -> None:
+    """A teljes lista újraírása – csak módosításnál, törlésnél és tömörítésnél kell.
+
+    A WAL tartalma ilyenkor már benne van a listában, ezért utána törölhető.
+    Az új fő fájl első sora a beolvasztott WAL azonosítója: ha a csere után,
+    de a törlés előtt áll le a program, a betöltés ebből tudja, hogy a WAL
+    sorai már szerepelnek. Változatlan tartalomnál (és üres WAL-nál) nem írunk semmit.
+    """
     ensure_data_dir()
-    if not SETTINGS_FILE.exists():
+    with _allapot_zar():
+        wal_id = _wal_azonosito(WAL_FILE)
+        fejlec = _json_dumps({WAL_FEJLEC: wal_id}) + b"\n" if wal_id else b""
+        payload = fejlec + b"".join(_json_dumps(t) + b"\n" for t in data)
+        if not WAL_FILE.exists() and _mar_kiirva("_data_hash", payload, data_snapshot()):
+            return
+        _atomic_write(DATA_FILE, payload)
+        WAL_FILE.unlink(missing_ok=True)
+        _fsync_dir(WAL_FILE.parent)
+        _invalidate_data_cache()
+        tar = _allapot_tar()
+        tar["_data_hash"] = (hash(payload), data_snapshot())
+        # Minden teljes írás után a korábban kirajzolt pozíciók érvénytelenek lehetnek
+        _uj_generacio(tar)
+        # Ha a közös listát írtuk ki, az a saját írásunk után is aktuális marad
+        if data is tar.get("data"):
+            tar["data_kulcs"] = data_snapshot()
+
+
+def append_record(rec: dict) -> None:
+    """Egy új tétel hozzáfűzése a WAL végére, a korábbi sorok újraírása nélkül.
+
+    A sor a visszatérés előtt lemezre kerül (fsync), ahogy a teljes mentésnél is.
+    A hívó a zár alatt már a közös listához is hozzáfűzte a tételt, így az
+    írás után a lista kulcsát frissíthetjük újratöltés helyett.
+    """
+    ensure_data_dir()
+    with _allapot_zar():
+        _wal_takaritas()
+        if not WAL_FILE.exists():
+            # Az új WAL atomikusan, a fejlécével együtt jön létre, így mindig azonosítható
+            _atomic_write(WAL_FILE, _json_dumps({WAL_FEJLEC: uuid.uuid4().hex}) + b"\n")
+        with WAL_FILE.open("ab") as f:
+            f.write(_json_dumps(rec) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        _invalidate_data_cache()
+        compact_if_needed()
+        tar = _allapot_tar()
+        if "data" in tar:
+            tar["data_kulcs"] = data_snapshot()
+
+
+def _meret(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def compact_if_needed() -> None:
+    """Ha a WAL túl nagyra nőtt, beolvasztja az adatfájlba.
+
+    A küszöb a fő fájl méretével együtt nő (az összméret kb. kétszerese az
+    élő adatnak), így a tömörítés költsége tételenként átlagosan állandó
+    marad, akármekkora is az előzmény.
+    """
+    wal_meret = _meret(WAL_FILE)
+    if wal_meret > max(WAL_MIN_BYTES, _meret(DATA_FILE)):
+        save_data(_load_data_cached(*data_snapshot()))
+
+
+@st.cache_data(show_spinner=False)
+def _load_settings_cached(path: str, mtime_ns: int) -> dict:
+    settings_file = Path(path)
+    if not settings_file.exists():
         return {}
     try:
-        with SETTINGS_FILE.open("r", encoding="utf-8") as f:
-            settings = json.load(f)
+        settings = _json_loads(settings_file.read_bytes())
         if not isinstance(settings, dict):
             return {}
         return settings
@@ -64,27 +325,295 @@ def load_settings() -> dict:
         return {}
 
 
-def save_settings(settings: dict) -> None:
+def load_settings() -> dict:
     ensure_data_dir()
-    with SETTINGS_FILE.open("w", encoding="utf-8") as f:
-        json.dump(settings, f, ensure_ascii=False, indent=2)
+    return _load_settings_cached(str(SETTINGS_FILE), _mtime_ns(SETTINGS_FILE))
 
 
-def get_dataframe(data: list[dict]) -> pd.DataFrame:
-    """Lista → DataFrame, dátum + típus rendezése."""
-    if not data:
+def save_settings(settings: dict) -> None:
+    ensure_data_dir()
+    payload = _json_dumps(settings)
+    with _allapot_zar():
+        if _mar_kiirva("_settings_hash", payload, _mtime_ns(SETTINGS_FILE)):
+            return
+        _atomic_write(SETTINGS_FILE, payload)
+        _load_settings_cached.clear()
+        tar = _allapot_tar()
+        tar["_settings_hash"] = (hash(payload), _mtime_ns(SETTINGS_FILE))
+        if settings is tar.get("settings"):
+            tar["settings_kulcs"] = _mtime_ns(SETTINGS_FILE)
+
+
+@dataclass
+class Store:
+    """A tételek oszlopos (SoA) alakban: mezőnként egy tömb, soronként egy elem.
+
+    A rekordlistából mezőnként egyetlen menetben épül fel, így a DataFrame
+    oszlopait nem kell soronként, dict-enként kikövetkeztetnie a pandasnak.
+    """
+
+    datum: np.ndarray  # datetime64[D]
+    osszeg: np.ndarray  # float64
+    kategoria: pd.Categorical
+    tipus: pd.Categorical  # TIPUS_DTYPE
+    megjegyzes: np.ndarray  # object (str)
+
+    @classmethod
+    def from_records(cls, data: list[dict]) -> "Store":
+        return cls(
+            # Az ISO dátumokat a NumPy közvetlenül parse-olja
+            datum=np.array([t["datum"] for t in data], dtype="datetime64[D]"),
+            osszeg=np.fromiter(
+                (t["osszeg"] for t in data), dtype="float64", count=len(data)
+            ),
+            # Kevés, ismétlődő érték: kategória típussal a groupby/isin egész kódokon fut
+            kategoria=pd.Categorical([t.get("kategoria") for t in data]),
+            # Ismeretlen típus (pl. kézzel szerkesztett fájlból) → hiányzó érték (-1 kód)
+            tipus=pd.Categorical.from_codes(
+                TIPUS_DTYPE.categories.get_indexer(
+                    [t.get("tipus", "kiadas") for t in data]
+                ),
+                dtype=TIPUS_DTYPE,
+            ),
+            megjegyzes=np.array([t.get("megjegyzes", "") for t in data], dtype=object),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame a tömbökből, másolás nélkül (TETEL_OSZLOPOK sorrendben)."""
         return pd.DataFrame(
-            columns=["datum", "tipus", "kategoria", "osszeg", "megjegyzes"]
+            {
+                "datum": self.datum,
+                "osszeg": self.osszeg,
+                "kategoria": self.kategoria,
+                "megjegyzes": self.megjegyzes,
+                "tipus": self.tipus,
+            },
+            copy=False,
         )
 
-    df = pd.DataFrame(data)
-    df["datum"] = pd.to_datetime(df["datum"]).dt.date
-    df["osszeg"] = df["osszeg"].astype(float)
-    if "tipus" not in df.columns:
-        df["tipus"] = "kiadas"
+
+@st.cache_resource
+def _megosztott_tar() -> dict:
+    """Folyamatszintű tár a nagyobb, csak olvasott objektumoknak (DataFrame, cube).
+
+    A st.cache_data minden híváskor másolatot adna vissza (pickle); innen
+    referencia jön, ezért a hívók nem módosíthatják helyben a kapott objektumot.
+    """
+    return {}
+
+
+def _megosztott(nev: str, kulcs: tuple, epit):
+    """A `nev` alatt tárolt objektum, ha a kulcsa még aktuális; különben újraépíti."""
+    tar = _megosztott_tar()
+    bejegyzes = tar.get(nev)
+    if bejegyzes is None or bejegyzes[0] != kulcs:
+        bejegyzes = (kulcs, epit())
+        tar[nev] = bejegyzes
+    return bejegyzes[1]
+
+
+def get_dataframe(path: str, mtime_ns: int) -> pd.DataFrame:
+    """Az adatfájl (path, mtime_ns) állapotához tartozó DataFrame, dátum szerint növekvő sorrendben.
+
+    A paraméterek a data_snapshot() kimenete. A tábla a Parquet pillanatképből
+    töltődik, vagy ha az nem érvényes, a (cache-elt) JSONL + WAL rekordokból épül.
+    Állapotonként egyszer készül el, és minden oldal ugyanazt a példányt kapja –
+    csak olvasásra.
+    """
+    return _megosztott("df", (path, mtime_ns), lambda: _epit_dataframe(path, mtime_ns))
+
+
+def _epit_dataframe(path: str, mtime_ns: int) -> pd.DataFrame:
+    snapshot = Path(path).with_suffix(".parquet")
+    forras = _forras_kulcs(path, mtime_ns)
+    df = _read_parquet_snapshot(snapshot, forras)
+    if df is not None:
+        return df
+
+    data = _load_data_cached(path, mtime_ns)
+    if not data:
+        return pd.DataFrame(columns=TETEL_OSZLOPOK + ["hbucket", "id"])
+
+    # A dátum datetime64 marad (nem Python date objektumok), így a szűrés
+    # és a rendezés vektorizált egész-összehasonlítás.
+    store = Store.from_records(data)
+    df = store.to_frame()
+    # Egész forint összegek → int32/int64; ha van tört érték, float marad
+    df["osszeg"] = pd.to_numeric(df["osszeg"], downcast="integer")
+    # Hónap azonosító egész számként (1970-01 óta eltelt hónapok): a szűrés
+    # egyetlen int összehasonlítás, Period objektumok és dátum-parse nélkül.
+    df["hbucket"] = store.datum.astype("datetime64[M]").astype("int32")
+    # "id": a tétel helye a data listában (szerkesztéshez/törléshez kell).
+    # Dátum szerint rendezve tároljuk, így a dátumszűrés bináris kereséssel megy.
+    df["id"] = np.arange(len(df))
+    df = df.sort_values("datum", kind="stable", ignore_index=True)
+    df.attrs["sema"] = DF_SEMA_VERZIO
+    df.attrs["forras"] = forras
+
+    _write_parquet_snapshot(df, snapshot)
+    return df
+
+
+def _forras_kulcs(path: str, mtime_ns: int) -> list[int]:
+    """Az adatállapot azonosítója a pillanatképhez: mtime + az adatfájl és a WAL mérete."""
+    data_file = Path(path)
+    return [mtime_ns, _meret(data_file) + _meret(data_file.with_suffix(".wal.jsonl"))]
+
+
+def _read_parquet_snapshot(snapshot: Path, forras: list[int]) -> pd.DataFrame | None:
+    """A Parquet pillanatkép betöltése, ha pontosan az adatfájl mostani állapotából készült.
+
+    A típusok (dátum, összeg, kategóriák) a fájlban tárolódnak, így nincs
+    szükség a JSON rekordok újra-parse-olására és konvertálására.
+    """
+    if not snapshot.exists():
+        return None
+    try:
+        df = pd.read_parquet(snapshot, engine="pyarrow")
+    except (OSError, ValueError):
+        return None
+    # Régebbi programverzió által írt pillanatkép: inkább újraépítjük
+    if df.attrs.get("sema") != DF_SEMA_VERZIO:
+        return None
+    # Csak a forrás egyezése számít, nem az, hogy a pillanatkép újabb-e: egy
+    # régebbi mtime-mal visszaállított mentés (cp -p, rsync -a) is újraépítést kér.
+    if df.attrs.get("forras") != forras:
+        return None
     return df
 
 
+def _write_parquet_snapshot(df: pd.DataFrame, snapshot: Path) -> None:
+    """Pillanatkép mentése; ha nem sikerül, a következő betöltés a JSONL-ből épít.
+
+    Előbb memóriába szerializálunk, majd _atomic_write-tal tesszük közzé, így
+    párhuzamos újraépítések és olvasók sem látnak félig kiírt fájlt.
+    """
+    try:
+        buf = io.BytesIO()
+        df.to_parquet(buf, engine="pyarrow", compression="zstd", index=False)
+        _atomic_write(snapshot, buf.getvalue())
+    except (OSError, ValueError):
+        snapshot.unlink(missing_ok=True)
+
+
+def build_cube(path: str, mtime_ns: int) -> pd.Series:
+    """Összegek hónap × típus × kategória bontásban, egyetlen menetben.
+
+    A kezdőlap és a statisztika minden mutatója ebből a (kicsi) Series-ből
+    származtatható, így nem kell többször végigmenni a teljes táblán.
+    Ugyanúgy megosztott, csak olvasható példány, mint a get_dataframe eredménye.
+    """
+    return _megosztott("cube", (path, mtime_ns), lambda: _epit_cube(path, mtime_ns))
+
+
+def _epit_cube(path: str, mtime_ns: int) -> pd.Series:
+    df = get_dataframe(path, mtime_ns)
+    szintek = ["hbucket", "tipus", "kategoria"]
+
+    tipus_kod = df["tipus"].cat.codes.to_numpy()
+    kat_kod = df["kategoria"].cat.codes.to_numpy()
+    ervenyes = (tipus_kod >= 0) & (kat_kod >= 0)
+    if not ervenyes.any():
+        return pd.Series(
+            dtype="float64", index=pd.MultiIndex.from_arrays([[], [], []], names=szintek)
+        )
+
+    # A három kulcsot egyetlen egész kódba fűzzük, és np.bincount-tal összegzünk:
+    # egy C-szintű menet a teljes táblán, Python objektumok és groupby nélkül.
+    honap = df["hbucket"].to_numpy()[ervenyes]
+    h0 = honap.min()
+    n_tipus = len(df["tipus"].cat.categories)
+    n_kat = len(df["kategoria"].cat.categories)
+    kod = ((honap - h0) * n_tipus + tipus_kod[ervenyes]) * n_kat + kat_kod[ervenyes]
+    n = (honap.max() - h0 + 1) * n_tipus * n_kat
+    osszegek = osszeg_kodonkent(kod, df["osszeg"].to_numpy()[ervenyes], n)
+
+    # Csak a ténylegesen előforduló kombinációk kerülnek a cube-ba
+    elofordul = np.flatnonzero(np.bincount(kod, minlength=n))
+    index = pd.MultiIndex.from_arrays(
+        [
+            h0 + elofordul // (n_tipus * n_kat),
+            df["tipus"].cat.categories.take(elofordul // n_kat % n_tipus),
+            df["kategoria"].cat.categories.take(elofordul % n_kat),
+        ],
+        names=szintek,
+    )
+    return pd.Series(osszegek[elofordul], index=index, name="osszeg")
+
+
+def osszeg_kodonkent(kodok: np.ndarray, ertekek: np.ndarray, n: int) -> np.ndarray:
+    """Összeg kódonként (0..n-1) – a groupby(...).sum() egész kódos megfelelője."""
+    return np.bincount(kodok, weights=ertekek, minlength=n)
+
+
+@st.cache_data(show_spinner=False)
+def build_csv_bytes(path: str, mtime_ns: int) -> bytes:
+    """Az export CSV tartalma; adatállapotonként egyszer készül el."""
+    df = get_dataframe(path, mtime_ns)
+    # Az Arrow C++ CSV írója oszloponként, egy menetben készít UTF-8 bájtokat.
+    # A dátum date32-ként (ÉÉÉÉ-HH-NN), a kategóriák sima szövegként kerülnek bele.
+    tabla = pa.table(
+        {
+            "datum": pa.array(df["datum"].to_numpy().astype("datetime64[D]")),
+            "osszeg": pa.array(df["osszeg"].to_numpy()),
+            "kategoria": pa.array(df["kategoria"]).cast(pa.string()),
+            "megjegyzes": pa.array(df["megjegyzes"].to_numpy(), type=pa.string()),
+            "tipus": pa.array(df["tipus"]).cast(pa.string()),
+        }
+    )
+    # UTF-8 BOM, hogy az Excel helyesen kezelje az ékezeteket
+    buf = io.BytesIO()
+    buf.write(b"\xef\xbb\xbf")
+    pacsv.write_csv(tabla, buf, pacsv.WriteOptions(delimiter=";"))
+    return buf.getvalue()
+
+
+def cube_szelet(cube: pd.Series, **szintek) -> pd.Series:
+    """A cube azon sorai, ahol a megadott index-szintek értéke egyezik."""
+    maszk = np.ones(len(cube), dtype=bool)
+    for szint, ertek in szintek.items():
+        maszk &= cube.index.get_level_values(szint) == ertek
+    return cube[maszk]
+
+
+def tipus_osszegek(cube: pd.Series) -> tuple[float, float]:
+    """(kiadás, bevétel) összeg a cube-ból két numpy redukcióval, groupby nélkül."""
+    tipus = cube.index.get_level_values("tipus")
+    ertekek = cube.to_numpy()
+    return float(ertekek[tipus == "kiadas"].sum()), float(ertekek[tipus == "bevetel"].sum())
+
+
+def tipus_maszk(oszlop: pd.Series, bitek: int) -> np.ndarray:
+    """Típusszűrő egyetlen léptetés + ÉS művelettel: a kód-adik bit jelzi a kiválasztást."""
+    # A hiányzó típus kódja (-1) uint8-ként 255; ekkora léptetés 0-t ad, így kiesik
+    kodok = oszlop.cat.codes.to_numpy().astype(np.uint8)
+    return ((np.uint8(1) << kodok) & bitek).astype(bool)
+
+
+def kategoria_maszk(oszlop: pd.Series, ertekek: list) -> np.ndarray:
+    """Series.isin kategória típusú oszlopra, a kis egész kódokon számolva."""
+    kodok = oszlop.cat.categories.get_indexer(ertekek)
+    return np.isin(oszlop.cat.codes.to_numpy(), kodok[kodok >= 0])
+
+
+_EZRES_ELVALASZTO = str.maketrans(",", " ")
+
+
+def huf(x: float) -> str:
+    """Összeg forintban, szóközzel tagolt ezresekkel (pl. "12 500 Ft")."""
+    return format(x, ",.0f").translate(_EZRES_ELVALASZTO) + " Ft"
+
+
+def honap_bucket(d: date) -> int:
+    """Dátum → hónap azonosító (1970-01 óta eltelt hónapok), a "hbucket" oszlophoz."""
+    return int(np.datetime64(d, "M").astype("int64"))
+
+
+def honap_cimkek(bucketek) -> np.ndarray:
+    """Hónap azonosítók → "ÉÉÉÉ-HH" feliratok a grafikonokhoz, egy lépésben."""
+    return np.asarray(bucketek, dtype="int64").astype("datetime64[M]").astype(str)
+
+
 # --- UI oldalak ---
 
 
@@ -95,26 +624,22 @@ def oldal_dashboard(data: list[dict], settings: dict) -> None:
         st.info("Még nincs rögzített tétel. Kezdd az 'Új tétel' menüpontnál.")
         return
 
-    df = get_dataframe(data).copy()
-    df["honap"] = pd.to_datetime(df["datum"]).dt.to_period("M")
+    df = get_dataframe(*data_snapshot())
+    cube = build_cube(*data_snapshot())
 
-    today = date.today()
-    aktualis_honap = pd.Period(today.strftime("%Y-%m"))
-    df_akt = df[df["honap"] == aktualis_honap]
-
-    havi_kiadas = df_akt.loc[df_akt["tipus"] == "kiadas", "osszeg"].sum()
-    havi_bevetel = df_akt.loc[df_akt["tipus"] == "bevetel", "osszeg"].sum()
+    aktualis_honap = honap_bucket(date.today())
+    havi_kiadas, havi_bevetel = tipus_osszegek(cube_szelet(cube, hbucket=aktualis_honap))
     havi_egyenleg = havi_bevetel - havi_kiadas
 
     havi_keret = float(settings.get("havi_keret", 0.0))
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Aktuális havi kiadás", f"{havi_kiadas:,.0f} Ft".replace(",", " "))
+        st.metric("Aktuális havi kiadás", huf(havi_kiadas))
     with col2:
-        st.metric("Aktuális havi bevétel", f"{havi_bevetel:,.0f} Ft".replace(",", " "))
+        st.metric("Aktuális havi bevétel", huf(havi_bevetel))
     with col3:
-        st.metric("Havi egyenleg", f"{havi_egyenleg:,.0f} Ft".replace(",", " "))
+        st.metric("Havi egyenleg", huf(havi_egyenleg))
 
     st.divider()
 
@@ -124,10 +649,10 @@ def oldal_dashboard(data: list[dict], settings: dict) -> None:
 
         col4, col5 = st.columns(2)
         with col4:
-            st.metric("Havi keret", f"{havi_keret:,.0f} Ft".replace(",", " "))
+            st.metric("Havi keret", huf(havi_keret))
         with col5:
             maradek = max(havi_keret - havi_kiadas, 0)
-            st.metric("Maradék keret", f"{maradek:,.0f} Ft".replace(",", " "))
+            st.metric("Maradék keret", huf(maradek))
 
         st.progress(
             min(felhasznalt_szazalek, 1.0),
@@ -145,11 +670,10 @@ def oldal_dashboard(data: list[dict], settings: dict) -> None:
 
     st.subheader("Top 3 kiadási kategória (aktuális hónap)")
     top = (
-        df_akt[df_akt["tipus"] == "kiadas"]
-        .groupby("kategoria")["osszeg"]
+        cube_szelet(cube, hbucket=aktualis_honap, tipus="kiadas")
+        .groupby(level="kategoria")
         .sum()
-        .sort_values(ascending=False)
-        .head(3)
+        .nlargest(3)
     )
 
     if top.empty:
@@ -158,42 +682,25 @@ def oldal_dashboard(data: list[dict], settings: dict) -> None:
         st.bar_chart(top)
 
     st.subheader("Legutóbbi 5 tétel")
-    df_recent = df.sort_values("datum", ascending=False).head(5).copy()
-    df_recent["tipus"] = df_recent["tipus"].map(
-        {"kiadas": "Kiadás", "bevetel": "Bevétel"}
+    # A cache-elt df-et nem módosítjuk: az assign csak az 5 soros szeletből készít újat
+    df_recent = df.iloc[::-1].head(5)
+    df_recent = df_recent.assign(
+        tipus=df_recent["tipus"].cat.rename_categories(TIPUS_CIMKEK)
     )
     st.dataframe(
         df_recent[["datum", "tipus", "kategoria", "osszeg", "megjegyzes"]],
         use_container_width=True,
+        column_config=DATUM_OSZLOP,
     )
 
 
-def oldal_uj_tetel(data: list[dict]) -> None:
+def oldal_uj_tetel() -> None:
     st.header("Új tétel rögzítése")
 
     # Kiadás / Bevétel választás
     tipus = st.radio("Típus", ["Kiadás", "Bevétel"], horizontal=True)
     tipus_kod = "kiadas" if tipus == "Kiadás" else "bevetel"
 
-    alap_kategoriak_kiadas = [
-        "Étkezés",
-        "Lakhatás",
-        "Közlekedés",
-        "Szórakozás",
-        "Egészség",
-        "Bevásárlás",
-        "Egyéb",
-    ]
-    alap_kategoriak_bevetel = [
-        "Fizetés",
-        "Ösztöndíj",
-        "Ajándék",
-        "Egyéb bevétel",
-    ]
-    alap_kategoriak = (
-        alap_kategoriak_kiadas if tipus_kod == "kiadas" else alap_kategoriak_bevetel
-    )
-
     with st.form("uj_tetel_form"):
         col1, col2 = st.columns(2)
         with col1:
@@ -201,7 +708,7 @@ def oldal_uj_tetel(data: list[dict]) -> None:
         with col2:
             osszeg = st.number_input("Összeg (Ft)", min_value=0.0, step=1000.0)
 
-        kategoria = st.selectbox("Kategória", alap_kategoriak)
+        kategoria = st.selectbox("Kategória", _KATEGORIAK[tipus_kod])
         megjegyzes = st.text_input("Megjegyzés (opcionális)")
 
         submitted = st.form_submit_button("Hozzáadás")
@@ -219,8 +726,10 @@ def oldal_uj_tetel(data: list[dict]) -> None:
             "tipus": tipus_kod,
         }
 
-        data.append(uj_tetel)
-        save_data(data)
+        # A közös lista friss állapotához fűzünk (más fül vagy külső írás után is)
+        with _allapot_zar():
+            aktualis_data().append(uj_tetel)
+            append_record(uj_tetel)
 
         st.success("Tétel elmentve!")
         st.balloons()
@@ -233,11 +742,32 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
         st.info("Még nincs rögzített tétel.")
         return
 
-    # DataFrame + egy "id" oszlop, ami a lista indexe
-    df = get_dataframe(data).copy()
-    df["id"] = df.index
+    # A DataFrame "id" oszlopa a tétel indexe a data listában; a generációt a
+    # tábla előtt olvassuk ki, így egy közbeni mentés legfeljebb elutasított írást okoz
+    generacio = adat_generacio()
+    df = get_dataframe(*data_snapshot())
+    _tetel_lista_fragment(data, df, generacio)
+
+
+def _kovetett_alapertek(kulcs: str, alap) -> None:
+    """A `kulcs` widget kezdőértéke; az új alapértékre lép, amíg a felhasználó nem írta át.
 
+    Az előző alapértéket a session_state-ben tartjuk: ha a widget még azon áll,
+    a szűrő érintetlen, így követheti az adatokat (pl. egy későbbi dátumú tételt).
+    """
+    elozo = st.session_state.get(kulcs + "_alap")
+    if kulcs not in st.session_state or st.session_state[kulcs] == elozo:
+        st.session_state[kulcs] = alap
+    st.session_state[kulcs + "_alap"] = alap
+
+
+@st.fragment
+def _tetel_lista_fragment(data: list[dict], df: pd.DataFrame, generacio: int) -> None:
+    """Szűrők, összegzés és lista; szűrőváltáskor csak ez a rész fut újra."""
     # --- Szűrők ---
+    # Állandó kulcsok: a widgetek azonossága nem függ az alapértékektől (pl. a
+    # legkésőbbi dátumtól), így egy módosítás utáni rerun sem állítja vissza a
+    # felhasználó által beállított szűrőket. Az érintetlen dátumhatárok követik az adatot.
     st.subheader("Szűrés")
 
     col0, col1, col2, col3 = st.columns(4)
@@ -247,24 +777,44 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
             options=["kiadas", "bevetel"],
             default=["kiadas", "bevetel"],
             format_func=lambda x: "Kiadás" if x == "kiadas" else "Bevétel",
+            key="lista_tipus",
         )
     with col1:
-        min_datum = df["datum"].min()
-        kezdo = st.date_input("Kezdő dátum", value=min_datum)
+        _kovetett_alapertek("lista_kezdo", df["datum"].iloc[0].date())
+        kezdo = st.date_input("Kezdő dátum", key="lista_kezdo")
     with col2:
-        max_datum = df["datum"].max()
-        veg = st.date_input("Vég dátum", value=max_datum)
+        _kovetett_alapertek("lista_veg", df["datum"].iloc[-1].date())
+        veg = st.date_input("Vég dátum", key="lista_veg")
     with col3:
-        kategoriak = df["kategoria"].unique().tolist()
-        kategoria_szuro = st.multiselect("Kategória", options=kategoriak)
-
-    maszk = (df["datum"] >= kezdo) & (df["datum"] <= veg)
-    if tipus_szuro:
-        maszk &= df["tipus"].isin(tipus_szuro)
-    if kategoria_szuro:
-        maszk &= df["kategoria"].isin(kategoria_szuro)
-
-    szurt = df[maszk].sort_values("datum", ascending=False)
+        # A kategóriák listája kész a Categorical-ban, nem kell unique() a teljes oszlopra
+        kategoriak = df["kategoria"].cat.categories.tolist()
+        kategoria_szuro = st.multiselect("Kategória", options=kategoriak, key="lista_kategoria")
+
+    # A df dátum szerint rendezett: a dátumtartomány két bináris kereséssel
+    # kijelölhető, a többi szűrő már csak ezen a szeleten fut.
+    datumok = df["datum"].to_numpy()
+    lo = np.searchsorted(datumok, np.datetime64(kezdo, "D"), side="left")
+    hi = np.searchsorted(datumok, np.datetime64(veg, "D"), side="right")
+    szurt = df.iloc[lo:hi]
+
+    # Típusonként egy bit (kiadas=1, bevetel=2). Ha minden típus ki van jelölve
+    # (alapállapot), vagy egy sem, a típusszűrő nem szűr semmit.
+    tipus_bitek = sum(1 << TIPUS_DTYPE.categories.get_loc(t) for t in tipus_szuro)
+    if tipus_bitek == (1 << len(TIPUS_DTYPE.categories)) - 1:
+        tipus_bitek = 0
+
+    # A maszk NumPy tömbökön épül, köztes bool Series-ek nélkül; szűrő nélkül
+    # a dátumszelet maga az eredmény, maszk sem készül.
+    if tipus_bitek or kategoria_szuro:
+        maszk = np.ones(len(szurt), dtype=bool)
+        if tipus_bitek:
+            maszk &= tipus_maszk(szurt["tipus"], tipus_bitek)
+        if kategoria_szuro:
+            maszk &= kategoria_maszk(szurt["kategoria"], kategoria_szuro)
+        szurt = szurt.iloc[maszk]
+
+    # Legújabb elöl
+    szurt = szurt.iloc[::-1]
 
     # --- Összegzés a szűrt adatokra ---
     st.markdown("### Összegzés (szűrt adatokra)")
@@ -274,19 +824,26 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
 
     col_a, col_b, col_c = st.columns(3)
     with col_a:
-        st.metric("Kiadások", f"{kiadasok:,.0f} Ft".replace(",", " "))
+        st.metric("Kiadások", huf(kiadasok))
     with col_b:
-        st.metric("Bevételek", f"{bevetel:,.0f} Ft".replace(",", " "))
+        st.metric("Bevételek", huf(bevetel))
     with col_c:
-        st.metric("Egyenleg", f"{egyenleg:,.0f} Ft".replace(",", " "))
+        st.metric("Egyenleg", huf(egyenleg))
 
     # --- Lista táblázatban ---
     st.markdown("### Részletes lista")
-    df_megj = szurt.copy()
-    df_megj["tipus"] = df_megj["tipus"].map(
-        {"kiadas": "Kiadás", "bevetel": "Bevétel"}
+    # Csak az aktuális oldal sorai mennek a böngészőnek, nem a teljes szűrt tábla
+    oldalak = max(1, -(-len(szurt) // LISTA_OLDALMERET))
+    oldal = 1
+    if oldalak > 1:
+        oldal = int(st.number_input("Oldal", min_value=1, max_value=oldalak, value=1, step=1))
+    nezet = szurt.iloc[(oldal - 1) * LISTA_OLDALMERET : oldal * LISTA_OLDALMERET]
+    # Csak a két kategória-címke cserélődik, a kódtömb nem másolódik soronként
+    df_megj = nezet.assign(tipus=nezet["tipus"].cat.rename_categories(TIPUS_CIMKEK))
+    st.dataframe(
+        df_megj[TETEL_OSZLOPOK], use_container_width=True, column_config=DATUM_OSZLOP
     )
-    st.dataframe(df_megj.drop(columns=["id"]), use_container_width=True)
+    st.caption(f"Összesen {len(szurt)} tétel, {oldal}/{oldalak}. oldal")
 
     # --- Szerkesztés / törlés szekció ---
     st.markdown("### Tétel módosítása vagy törlése")
@@ -295,15 +852,30 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
         st.info("A szűrők alapján nincs megjeleníthető tétel.")
         return
 
+    _tetel_szerkesztes_fragment(data, szurt, generacio)
+
+
+@st.fragment
+def _tetel_szerkesztes_fragment(
+    data: list[dict], szurt: pd.DataFrame, generacio: int
+) -> None:
+    """Módosítás / törlés; a tétel kiválasztása nem rajzolja újra a listát.
+
+    Mentés és törlés után az egész app újrafut (st.rerun), hogy minden oldal
+    a friss adatot lássa. A fragment újrafutásai a legutóbbi teljes futás
+    argumentumait kapják, ezért írás előtt a `generacio` egyezését ellenőrizzük.
+    """
     # Legördülő lista a tételekhez (id + rövid leírás)
-    id_to_label = {}
-    for _, row in szurt.iterrows():
-        label_tipus = "Kiadás" if row["tipus"] == "kiadas" else "Bevétel"
-        label = (
-            f'#{int(row["id"])} | {label_tipus} | '
-            f'{row["datum"]} | {row["kategoria"]} | {row["osszeg"]:.0f} Ft'
-        )
-        id_to_label[int(row["id"])] = label
+    label_tipus = szurt["tipus"].cat.rename_categories(TIPUS_CIMKEK)
+    labels = (
+        "#" + szurt["id"].astype(str)
+        + " | " + label_tipus.astype(str)
+        + " | " + szurt["datum"].dt.strftime("%Y-%m-%d")
+        + " | " + szurt["kategoria"].astype(str)
+        + " | " + szurt["osszeg"].round(0).astype("int64").astype(str)
+        + " Ft"
+    )
+    id_to_label = dict(zip(szurt["id"].tolist(), labels.tolist()))
 
     selected_id = st.selectbox(
         "Tétel kiválasztása",
@@ -319,22 +891,6 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
     with col_left:
         st.subheader("Módosítás")
 
-        alap_kategoriak_kiadas = [
-            "Étkezés",
-            "Lakhatás",
-            "Közlekedés",
-            "Szórakozás",
-            "Egészség",
-            "Bevásárlás",
-            "Egyéb",
-        ]
-        alap_kategoriak_bevetel = [
-            "Fizetés",
-            "Ösztöndíj",
-            "Ajándék",
-            "Egyéb bevétel",
-        ]
-
         tipus_index = 0 if selected_row["tipus"] == "kiadas" else 1
 
         with st.form("edit_form"):
@@ -346,15 +902,12 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
             )
             tipus_kod = "kiadas" if tipus_valaszto == "Kiadás" else "bevetel"
 
-            if tipus_kod == "kiadas":
-                kategoriak_val = alap_kategoriak_kiadas.copy()
-            else:
-                kategoriak_val = alap_kategoriak_bevetel.copy()
+            kategoriak_val = list(_KATEGORIAK[tipus_kod])
 
             if selected_row["kategoria"] not in kategoriak_val:
                 kategoriak_val.append(selected_row["kategoria"])
 
-            datum_uj = st.date_input("Dátum", value=selected_row["datum"])
+            datum_uj = st.date_input("Dátum", value=selected_row["datum"].date())
             osszeg_uj = st.number_input(
                 "Összeg (Ft)",
                 min_value=0.0,
@@ -377,12 +930,15 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
             if osszeg_uj <= 0:
                 st.error("Az összegnek nagyobbnak kell lennie 0-nál.")
             else:
-                data[selected_id]["datum"] = datum_uj.isoformat()
-                data[selected_id]["osszeg"] = float(osszeg_uj)
-                data[selected_id]["kategoria"] = kategoria_uj
-                data[selected_id]["megjegyzes"] = megjegyzes_uj.strip()
-                data[selected_id]["tipus"] = tipus_kod
-                save_data(data)
+                with _allapot_zar():
+                    if not _lista_valtozatlan(data, generacio):
+                        st.rerun()
+                    data[selected_id]["datum"] = datum_uj.isoformat()
+                    data[selected_id]["osszeg"] = float(osszeg_uj)
+                    data[selected_id]["kategoria"] = kategoria_uj
+                    data[selected_id]["megjegyzes"] = megjegyzes_uj.strip()
+                    data[selected_id]["tipus"] = tipus_kod
+                    save_data(data)
                 st.success("Tétel módosítva.")
                 st.rerun()
 
@@ -390,8 +946,11 @@ def oldal_tetelek_listaja(data: list[dict]) -> None:
     with col_right:
         st.subheader("Törlés")
         if st.button("Kiválasztott tétel törlése"):
-            data.pop(selected_id)
-            save_data(data)
+            with _allapot_zar():
+                if not _lista_valtozatlan(data, generacio):
+                    st.rerun()
+                data.pop(selected_id)
+                save_data(data)
             st.success("Tétel törölve.")
             st.rerun()
 
@@ -403,31 +962,27 @@ def oldal_statisztika(data: list[dict], settings: dict) -> None:
         st.info("Még nincs rögzített tétel, így statisztika sem.")
         return
 
-    df = get_dataframe(data)
+    cube = build_cube(*data_snapshot())
 
     # Összesített számok
     st.subheader("Összesítés")
 
-    kiadasok = df.loc[df["tipus"] == "kiadas", "osszeg"].sum()
-    bevetel = df.loc[df["tipus"] == "bevetel", "osszeg"].sum()
+    kiadasok, bevetel = tipus_osszegek(cube)
     egyenleg = bevetel - kiadasok
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Összes kiadás", f"{kiadasok:,.0f} Ft".replace(",", " "))
+        st.metric("Összes kiadás", huf(kiadasok))
     with col2:
-        st.metric("Összes bevétel", f"{bevetel:,.0f} Ft".replace(",", " "))
+        st.metric("Összes bevétel", huf(bevetel))
     with col3:
-        st.metric("Egyenleg", f"{egyenleg:,.0f} Ft".replace(",", " "))
+        st.metric("Egyenleg", huf(egyenleg))
 
     # Havi keret – csak kiadásokra
     st.subheader("Aktuális hónap kerete (kiadásokra)")
 
-    today = date.today()
-    df["honap"] = pd.to_datetime(df["datum"]).dt.to_period("M")
-    aktualis_honap = pd.Period(today.strftime("%Y-%m"))
-    df_havi_kiadas = df[(df["honap"] == aktualis_honap) & (df["tipus"] == "kiadas")]
-    havi_kiadas = df_havi_kiadas["osszeg"].sum()
+    aktualis_honap = honap_bucket(date.today())
+    havi_kiadas = cube_szelet(cube, hbucket=aktualis_honap, tipus="kiadas").sum()
 
     havi_keret = float(settings.get("havi_keret", 0.0))
 
@@ -435,12 +990,9 @@ def oldal_statisztika(data: list[dict], settings: dict) -> None:
         felhasznalt_szazalek = havi_kiadas / havi_keret if havi_keret > 0 else 0
         col3a, col3b = st.columns(2)
         with col3a:
-            st.metric("Havi keret", f"{havi_keret:,.0f} Ft".replace(",", " "))
+            st.metric("Havi keret", huf(havi_keret))
         with col3b:
-            st.metric(
-                "Eddig elköltve ebben a hónapban",
-                f"{havi_kiadas:,.0f} Ft".replace(",", " "),
-            )
+            st.metric("Eddig elköltve ebben a hónapban", huf(havi_kiadas))
 
         st.progress(
             min(felhasznalt_szazalek, 1.0),
@@ -457,8 +1009,8 @@ def oldal_statisztika(data: list[dict], settings: dict) -> None:
     # Kategóriánkénti kiadások
     st.subheader("Kategóriánkénti kiadások")
     by_cat_kiadas = (
-        df[df["tipus"] == "kiadas"]
-        .groupby("kategoria")["osszeg"]
+        cube_szelet(cube, tipus="kiadas")
+        .groupby(level="kategoria")
         .sum()
         .sort_values(ascending=False)
     )
@@ -470,16 +1022,26 @@ def oldal_statisztika(data: list[dict], settings: dict) -> None:
     # Havi egyenleg grafikon
     st.subheader("Havi egyenleg (bevétel - kiadás)")
 
-    by_month = (
-        df.groupby(["honap", "tipus"])["osszeg"]
-        .sum()
-        .unstack(fill_value=0)
-        .rename(columns={"kiadas": "Kiadás", "bevetel": "Bevétel"})
-    )
-    by_month["Egyenleg"] = by_month.get("Bevétel", 0) - by_month.get("Kiadás", 0)
-    by_month.index = by_month.index.astype(str)
+    tipusok = cube.index.unique(level="tipus")
+    if len(tipusok) == 1:
+        # Csak egyféle tétel van (pl. eddig csak kiadás): nincs mit unstack-elni,
+        # a hiányzó típus nulla oszlopa sem készül el.
+        tipus = tipusok[0]
+        havi = cube.groupby(level="hbucket").sum()
+        by_month = havi.to_frame(TIPUS_CIMKEK[tipus])
+        by_month["Egyenleg"] = havi if tipus == "bevetel" else -havi
+    else:
+        by_month = (
+            cube.groupby(level=["hbucket", "tipus"])
+            .sum()
+            .unstack(fill_value=0)
+            .rename(columns=TIPUS_CIMKEK)
+        )
+        by_month["Egyenleg"] = by_month["Bevétel"] - by_month["Kiadás"]
+        by_month = by_month[["Kiadás", "Bevétel", "Egyenleg"]]
+    by_month.index = honap_cimkek(by_month.index)
 
-    st.line_chart(by_month[["Kiadás", "Bevétel", "Egyenleg"]])
+    st.line_chart(by_month)
 
 
 def oldal_beallitasok(settings: dict) -> dict:
@@ -495,8 +1057,10 @@ def oldal_beallitasok(settings: dict) -> dict:
     )
 
     if st.button("Keret mentése"):
-        settings["havi_keret"] = float(uj_keret)
-        save_settings(settings)
+        with _allapot_zar():
+            settings = aktualis_settings()
+            settings["havi_keret"] = float(uj_keret)
+            save_settings(settings)
         st.success("Keret elmentve!")
 
     st.caption("A keretet az aktuális hónap kiadásaihoz hasonlítjuk a Statisztika oldalon.")
@@ -510,13 +1074,11 @@ def oldal_export(data: list[dict]) -> None:
         st.info("Még nincs exportálható adat.")
         return
 
-    df = get_dataframe(data)
+    df = get_dataframe(*data_snapshot())
 
     st.markdown("### Összes tétel exportálása")
 
-    # String → UTF-8 BOM-os byte-tömb, hogy az Excel helyesen kezelje az ékezeteket
-    csv_all = df.to_csv(index=False, sep=";")
-    csv_bytes = csv_all.encode("utf-8-sig")
+    csv_bytes = build_csv_bytes(*data_snapshot())
 
     st.download_button(
         label="Összes tétel exportálása (CSV)",
@@ -526,35 +1088,119 @@ def oldal_export(data: list[dict]) -> None:
     )
 
     st.markdown("### Előnézet (utolsó 20 tétel)")
-    st.dataframe(df.tail(20), use_container_width=True)
+    st.dataframe(
+        df[TETEL_OSZLOPOK].tail(20), use_container_width=True, column_config=DATUM_OSZLOP
+    )
 
 
 # --- Főprogram ---
 
 
+@st.cache_resource
+def _allapot_tar() -> dict:
+    """Folyamatszintű, módosítható állapot: tétellista, beállítások, utolsó mentések hash-e.
+
+    A st.cache_resource referenciát ad vissza (nincs hash-elés, másolás), így
+    a rerunok ingyen kapják meg. Minden böngészőfül ugyanazt a listát látja;
+    hogy a lapon kirajzolt pozíciók még érvényesek-e, a "generacio" számláló
+    mutatja (lásd adat_generacio).
+    """
+    return {}
+
+
+def _uj_generacio(tar: dict) -> None:
+    tar["generacio"] = tar.get("generacio", 0) + 1
+
+
+def adat_generacio() -> int:
+    """A közös lista generációja: minden mentés és újratöltés növeli.
+
+    A lista oldal ezt a kirajzoláskor elteszi; ha íráskor már más, a tételek
+    pozíciói (az "id"-k) közben elmozdulhattak.
+    """
+    return _allapot_tar().get("generacio", 0)
+
+
+@st.cache_resource
+def _allapot_zar() -> threading.RLock:
+    """Zár a közös állapothoz: minden munkamenet saját szálon fut, de egy listát módosít.
+
+    Újrahívható (RLock), mert a mentések a lapok zárolt szakaszain belül is zárolnak.
+    """
+    return threading.RLock()
+
+
+def aktualis_data() -> list[dict]:
+    """A közös tétellista; az első olyan oldalon töltődik be, amelyik használja.
+
+    A lapok ugyanezt a listát módosítják helyben, mielőtt lemezre írnak,
+    így nem kell rerunonként újra betölteni. Ha a fájlok kívülről (vagy egy
+    másik folyamatból) megváltoztak, a data_snapshot kulcs eltér, és újratöltjük.
+    """
+    tar = _allapot_tar()
+    with _allapot_zar():
+        kulcs = data_snapshot()
+        if "data" not in tar or tar.get("data_kulcs") != kulcs:
+            tar["data"] = load_data()
+            tar["data_kulcs"] = kulcs
+            _uj_generacio(tar)
+        return tar["data"]
+
+
+def aktualis_settings() -> dict:
+    tar = _allapot_tar()
+    with _allapot_zar():
+        kulcs = _mtime_ns(SETTINGS_FILE)
+        if "settings" not in tar or tar.get("settings_kulcs") != kulcs:
+            tar["settings"] = load_settings()
+            tar["settings_kulcs"] = kulcs
+        return tar["settings"]
+
+
+def _lista_valtozatlan(data: list[dict], generacio: int) -> bool:
+    """True, ha a lap kirajzolása óta a közös lista nem változott (zár alatt hívandó).
+
+    Ha közben egy másik fül mentett, vagy külső írás miatt újratöltődött, a
+    lapon lévő azonosítók már nem érvényesek: ilyenkor nem módosítunk semmit.
+    """
+    if aktualis_data() is data and adat_generacio() == generacio:
+        return True
+    st.toast("Az adatok időközben megváltoztak, a lista frissült. Válaszd ki újra a tételt.")
+    return False
+
+
 def main():
     st.title("💰 Költségkövető és statisztika – bevételekkel")
 
-    data = load_data()
-    settings = load_settings()
-
     oldal = st.sidebar.radio(
         "Menü",
         ("Kezdőlap", "Új tétel", "Tételek listája", "Statisztika", "Beállítások", "Exportálás"),
     )
 
+    # Ha a fájlokat kívülről módosították, ezzel lehet friss állapotot kérni
+    if st.sidebar.button("Újratöltés lemezről"):
+        with _allapot_zar():
+            tar = _allapot_tar()
+            generacio = adat_generacio()
+            tar.clear()
+            # A számláló nem indulhat újra, különben egy régi lap azonosítói érvényesnek tűnnének
+            tar["generacio"] = generacio + 1
+            _invalidate_data_cache()
+            _load_settings_cached.clear()
+
+    # Csak azt töltjük be, amire a kiválasztott oldalnak szüksége van
     if oldal == "Kezdőlap":
-        oldal_dashboard(data, settings)
+        oldal_dashboard(aktualis_data(), aktualis_settings())
     elif oldal == "Új tétel":
-        oldal_uj_tetel(data)
+        oldal_uj_tetel()
     elif oldal == "Tételek listája":
-        oldal_tetelek_listaja(data)
+        oldal_tetelek_listaja(aktualis_data())
     elif oldal == "Statisztika":
-        oldal_statisztika(data, settings)
+        oldal_statisztika(aktualis_data(), aktualis_settings())
     elif oldal == "Beállítások":
-        oldal_beallitasok(settings)
+        oldal_beallitasok(aktualis_settings())
     elif oldal == "Exportálás":
-        oldal_export(data)
+        oldal_export(aktualis_data())
 
 
 if __name__ == "__main__":